@@ -324,21 +324,11 @@ class ControlMode(Enum):
 
     @property
     def is_lines(self):
-        return self in [
-            ControlMode.scribble,
-            ControlMode.line_art,
-            ControlMode.soft_edge,
-            ControlMode.canny_edge,
-        ]
+        return self in _control_lines
 
     @property
     def has_preprocessor(self):
-        return self.is_control_net and self not in [
-            ControlMode.inpaint,
-            ControlMode.blur,
-            ControlMode.stencil,
-            ControlMode.universal,
-        ]
+        return self.is_control_net and self not in _control_without_preprocessor
 
     @property
     def is_control_net(self):
@@ -346,20 +336,15 @@ class ControlMode(Enum):
 
     @property
     def is_ip_adapter(self):
-        return self in [
-            ControlMode.reference,
-            ControlMode.face,
-            ControlMode.style,
-            ControlMode.composition,
-        ]
+        return self in _control_ip_adapter
 
     @property
     def is_internal(self):  # don't show in control layer mode dropdown
-        return self in [ControlMode.inpaint, ControlMode.universal]
+        return self in _control_internal
 
     @property
     def is_part_of_image(self):  # not only used as guidance hint
-        return self in [ControlMode.reference, ControlMode.line_art, ControlMode.blur]
+        return self in _control_part_of_image
 
     @property
     def is_structural(self):  # strong impact on image composition/structure
@@ -428,6 +413,28 @@ class ControlMode(Enum):
         return False
 
 
+_control_lines = frozenset((
+    ControlMode.scribble,
+    ControlMode.line_art,
+    ControlMode.soft_edge,
+    ControlMode.canny_edge,
+))
+_control_without_preprocessor = frozenset((
+    ControlMode.inpaint,
+    ControlMode.blur,
+    ControlMode.stencil,
+    ControlMode.universal,
+))
+_control_ip_adapter = frozenset((
+    ControlMode.reference,
+    ControlMode.face,
+    ControlMode.style,
+    ControlMode.composition,
+))
+_control_internal = frozenset((ControlMode.inpaint, ControlMode.universal))
+_control_part_of_image = frozenset((ControlMode.reference, ControlMode.line_art, ControlMode.blur))
+
+
 def resource_id(kind: ResourceKind, arch: Arch, identifier: ControlMode | UpscalerName | str):
     if isinstance(identifier, Enum):
         identifier = identifier.name
@@ -111,8 +111,9 @@ class ControlLayer(QObject, ObservableProperties):
 
     @index.setter
     def index(self, index: int):
-        self._index = index
-        self._update_is_supported()
+        if index != self._index:
+            self._index = index
+            self._update_is_supported()
 
     def to_api(self, bounds: Bounds | None = None, time: int | None = None):
         layer = self.layer
@@ -210,7 +211,7 @@ class ControlLayer(QObject, ObservableProperties):
 
         active = not (self._generate_job is None or self._generate_job.state is JobState.finished)
         if self.has_active_job and not active:
-            self._job = None  # job done
+            self._generate_job = None  # job done
         self.has_active_job = active
 
 
@@ -257,9 +258,13 @@ class ControlLayerList(QObject):
             c.index = i
 
     def to_api(self, bounds: Bounds | None = None, time: int | None = None):
-        for layer in (c for c in self._layers if not c.is_supported):
-            log.warning(f"Trying to use control layer {layer.mode.name}: {layer.error_text}")
-        return [c.to_api(bounds, time) for c in self._layers if c.is_supported]
+        result: list[ControlInput] = []
+        for c in self._layers:
+            if c.is_supported:
+                result.append(c.to_api(bounds, time))
+            else:
+                log.warning(f"Trying to use control layer {c.mode.name}: {c.error_text}")
+        return result
 
     def _update_last_mode(self, mode: ControlMode):
         self._last_mode = mode
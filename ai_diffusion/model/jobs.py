@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import heapq
+import time
 from collections import deque
+from collections.abc import Iterable
 from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
 from enum import Enum, Flag
@@ -35,6 +38,9 @@ class JobKind(Enum):
     animation = 6  # full animation in one job
 
 
+_history_kinds = (JobKind.diffusion, JobKind.animation)
+
+
 @dataclass
 class JobRegion:
     layer_id: str
@@ -121,23 +127,38 @@ class Job:
     id: str | None
     kind: JobKind
     state = JobState.queued
+    order = 0  # position in the queue, assigned when the job is added
     params: JobParams
     control: control.ControlLayer | None = None
-    timestamp: datetime
-    results: ImageCollection
+    memory_usage = 0  # in bytes, size of results
     in_use: dict[int, bool]
 
     def __init__(self, id: str | None, kind: JobKind, params: JobParams):
         self.id = id
         self.kind = kind
         self.params = params
-        self.timestamp = datetime.now(timezone.utc)
-        self.results = ImageCollection()
+        self._time = time.time()  # converted to datetime only when displayed
+        self._results: ImageCollection | None = None
         self.in_use = {}
 
     def result_was_used(self, index: int):
         return self.in_use.get(index, False)
 
+    @property
+    def results(self) -> ImageCollection:
+        return self._results or _no_results
+
+    @results.setter
+    def results(self, results: ImageCollection):
+        self._results = results
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self._time, timezone.utc)
+
+
+_no_results = ImageCollection()  # shared by jobs which have no results (yet)
+
 
 class JobQueue(QObject):
     """Queue of waiting, ongoing and finished jobs for one document."""
@@ -155,10 +176,16 @@ class JobQueue(QObject):
 
     def __init__(self):
         super().__init__()
-        self._entries: deque[Job] = deque()
+        # Diffusion/Animation jobs: kept for history, pruned according to memory usage
+        # Other jobs: removed immediately once finished
+        self._history: deque[Job] = deque()
+        self._transient: dict[int, Job] = {}
+        self._next_order = 0
+        self._by_id: dict[str, Job] = {}
+        self._state_counts = dict.fromkeys(JobState.__members__.values(), 0)
         self._selection: list[JobQueue.Item] = []
         self._previous_selection: JobQueue.Item | None = None
-        self._memory_usage = 0  # in MB
+        self._memory_usage = 0  # in bytes
 
     def add(self, kind: JobKind, params: JobParams):
         return self.add_job(Job(None, kind, params))
@@ -169,21 +196,40 @@ class JobQueue(QObject):
         return self.add_job(job)
 
     def add_job(self, job: Job):
-        self._entries.append(job)
+        job.order = self._next_order
+        self._next_order += 1
+        if job.kind in _history_kinds:
+            self._history.append(job)
+        else:
+            self._transient[job.order] = job
+        if job.id is not None:
+            self._by_id[job.id] = job
+        self._state_counts[job.state] += 1
         self.count_changed.emit()
         return job
 
+    def assign_id(self, job: Job, id: str):
+        job.id = id
+        if self._contains(job):  # job may have been removed while it was being enqueued
+            self._by_id[id] = job
+
     def remove(self, job: Job):
-        # Diffusion/Animation jobs: kept for history, pruned according to meomry usage
-        # Other jobs: removed immediately once finished
-        self._entries.remove(job)
+        self._remove(job)
         self.count_changed.emit()
 
+    def remove_many(self, jobs: Iterable[Job]):
+        removed = False
+        for job in jobs:
+            self._remove(job)
+            removed = True
+        if removed:
+            self.count_changed.emit()
+
     def find(self, id: str):
-        return next((j for j in self._entries if j.id == id), None)
+        return self._by_id.get(id)
 
     def count(self, state: JobState):
-        return sum(1 for j in self._entries if j.state is state)
+        return self._state_counts[state]
 
     def has_item(self, item: Item):
         job = self.find(item.job)
@@ -191,26 +237,27 @@ class JobQueue(QObject):
 
     def set_results(self, job: Job, results: ImageCollection):
         job.results = results
-        if job.kind in [JobKind.diffusion, JobKind.animation]:
-            self._memory_usage += results.size / (1024**2)
+        if job.kind in _history_kinds:
+            job.memory_usage = results.size
+            self._memory_usage += job.memory_usage
             self.prune(keep=job)
 
     def notify_started(self, job: Job):
         if job.state is not JobState.executing:
-            job.state = JobState.executing
+            self._set_state(job, JobState.executing)
             self.count_changed.emit()
 
     def notify_finished(self, job: Job):
-        job.state = JobState.finished
+        self._set_state(job, JobState.finished)
         self.job_finished.emit(job)
         self._cancel_earlier_jobs(job)
         self.count_changed.emit()
 
-        if job.kind not in [JobKind.diffusion, JobKind.animation]:
+        if job.kind not in _history_kinds:
             self.remove(job)
 
     def notify_cancelled(self, job: Job):
-        job.state = JobState.cancelled
+        self._set_state(job, JobState.cancelled)
         self._cancel_earlier_jobs(job)
         self.count_changed.emit()
 
@@ -230,13 +277,15 @@ class JobQueue(QObject):
             self.selection = [self._previous_selection]
 
     def _discard_job(self, job: Job):
-        self._entries.remove(job)
-        self._memory_usage -= job.results.size / (1024**2)
+        self._history.remove(job)
+        self._forget(job)
+        self._memory_usage -= job.memory_usage
         self.job_discarded.emit(job)
 
     def prune(self, keep: Job):
-        while self._memory_usage > settings.history_size and self._entries[0] != keep:
-            self._discard_job(self._entries[0])
+        max_usage = settings.history_size * 1024**2
+        while self._memory_usage > max_usage and self._history[0] is not keep:
+            self._discard_job(self._history[0])
 
     def discard(self, job_id: str, index: int):
         job = ensure(self.find(job_id))
@@ -246,29 +295,26 @@ class JobQueue(QObject):
         for i in range(index, len(job.results) - 1):
             job.in_use[i] = job.in_use.get(i + 1, False)
         img = job.results.remove(index)
-        self._memory_usage -= img.size / (1024**2)
+        job.memory_usage -= img.size
+        self._memory_usage -= img.size
         self.result_discarded.emit(self.Item(job_id, index))
 
     def clear(self):
-        jobs_to_discard = [
-            job
-            for job in self._entries
-            if job.kind in (JobKind.diffusion, JobKind.animation) and job.state is JobState.finished
-        ]
+        jobs_to_discard = [job for job in self._history if job.state is JobState.finished]
         for job in jobs_to_discard:
             self._discard_job(job)
 
     def any_executing(self):
-        return any(j.state is JobState.executing for j in self._entries)
+        return self._state_counts[JobState.executing] > 0
 
     def __len__(self):
-        return len(self._entries)
+        return len(self._history) + len(self._transient)
 
     def __getitem__(self, i):
-        return self._entries[i]
+        return list(self)[i]
 
     def __iter__(self):
-        return iter(self._entries)
+        return heapq.merge(self._history, self._transient.values(), key=lambda j: j.order)
 
     @property
     def selection(self):
@@ -281,17 +327,39 @@ class JobQueue(QObject):
             self.selection_changed.emit()
 
     @property
-    def memory_usage(self):
-        return self._memory_usage
+    def memory_usage(self):  # in MB
+        return self._memory_usage / (1024**2)
+
+    def _remove(self, job: Job):
+        if job.kind in _history_kinds:
+            self._history.remove(job)
+        else:
+            del self._transient[job.order]
+        self._forget(job)
+
+    def _contains(self, job: Job):
+        if job.kind in _history_kinds:
+            return job in self._history
+        return self._transient.get(job.order) is job
+
+    def _forget(self, job: Job):
+        if job.id is not None and self._by_id.get(job.id) is job:
+            del self._by_id[job.id]
+        self._state_counts[job.state] -= 1
+
+    def _set_state(self, job: Job, state: JobState):
+        self._state_counts[job.state] -= 1
+        self._state_counts[state] += 1
+        job.state = state
 
     def _cancel_earlier_jobs(self, job: Job):
         # Clear jobs that should have been completed before, but may not have completed
         # (still queued or executing state) due to sporadic server disconnect
-        for j in self._entries:
+        for j in self:
             if j is job:
                 break
             if j.state in [JobState.queued, JobState.executing]:
-                j.state = JobState.cancelled
+                self._set_state(j, JobState.cancelled)
 
 
 def _move_field(src: dict[str, Any], field: str, dest: dict[str, Any]):
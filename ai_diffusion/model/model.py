@@ -5,6 +5,7 @@ import time
 import uuid
 import weakref
 from collections import deque
+from collections.abc import Coroutine
 from copy import copy
 from dataclasses import dataclass, replace
 from datetime import datetime, timezone
@@ -123,6 +124,14 @@ class Error(NamedTuple):
 
 no_error = Error(ErrorKind.none, "")
 
+# Workflow kind by (refine existing image, has mask)
+_workflow_kinds = {
+    (False, False): WorkflowKind.generate,
+    (True, False): WorkflowKind.refine,
+    (False, True): WorkflowKind.inpaint,
+    (True, True): WorkflowKind.refine_region,
+}
+
 
 class DocumentModel(QObject, ObservableProperties):
     """Represents diffusion workflows for a specific Krita document. Stores all inputs related to
@@ -227,16 +236,18 @@ class DocumentModel(QObject, ObservableProperties):
         jobs = self.enqueue_jobs(
             input, JobKind.diffusion, job_params, cond_orig, self.batch_count, queue_mode
         )
-        eventloop.run(_report_errors(self, jobs))
+        _run_reporting_errors(self, jobs)
 
     def _prepare_workflow(self, dryrun=False):
+        # Properties below resolve the style and architecture each time, read them only once
+        style = self.active_style
         arch = self.arch
-        workflow_kind = WorkflowKind.generate
+        is_editing = self.is_editing
         strength = self.strength
         if arch is Arch.qwen_l:
             strength = 1.0
-        if strength < 1.0 or self.is_editing:
-            workflow_kind = WorkflowKind.refine
+        refine = strength < 1.0 or is_editing
+        workflow_kind = _workflow_kinds[refine, False]
         client = self._connection.client
         image = None
         inpaint_mode: InpaintMode | None = None
@@ -276,20 +287,16 @@ class DocumentModel(QObject, ObservableProperties):
             conditioning, self.style, seed, arch, inpaint_instruction, ref_layers
         )
 
-        if mask is not None or workflow_kind is WorkflowKind.refine:
+        if mask is not None or refine:
             image = self._get_current_image(bounds) if not dryrun else DummyImage(bounds.extent)
 
         if mask is not None:
-            if workflow_kind is WorkflowKind.generate:
-                workflow_kind = WorkflowKind.inpaint
-            elif workflow_kind is WorkflowKind.refine:
-                workflow_kind = WorkflowKind.refine_region
-
+            workflow_kind = _workflow_kinds[refine, True]
             bounds, mask.bounds = compute_relative_bounds(bounds, mask.bounds)
 
             assert inpaint_mode is not None
             if inpaint_mode is InpaintMode.custom:
-                inpaint = self.inpaint.get_params(mask, self.is_editing)
+                inpaint = self.inpaint.get_params(mask, is_editing)
             else:
                 inpaint = workflow.detect_inpaint(
                     inpaint_mode, mask.bounds, arch, conditioning, strength
@@ -300,7 +307,7 @@ class DocumentModel(QObject, ObservableProperties):
             workflow_kind,
             image or extent,
             conditioning,
-            self.active_style,
+            style,
             seed,
             client.models,
             FileLibrary.instance(),
@@ -314,7 +321,7 @@ class DocumentModel(QObject, ObservableProperties):
         loras = input.models.loras if input.models else []
         job_name = prompt_meta.get("prompt_eval", prompt_meta["prompt"])
         job_params = JobParams(bounds, job_name, regions=job_regions)
-        job_params.set_style(self.active_style, ensure(input.models).checkpoint)
+        job_params.set_style(style, ensure(input.models).checkpoint)
         job_params.set_control(regions.control)
         job_params.inpaint_mode = inpaint_mode
         job_params.ref_layers = ref_layers
@@ -369,7 +376,7 @@ class DocumentModel(QObject, ObservableProperties):
         if not self.jobs.any_executing():
             self.progress = 0.0
         client = self._connection.client
-        job.id = await client.enqueue(input, front)
+        self.jobs.assign_id(job, await client.enqueue(input, front))
 
     def _prepare_upscale_image(self, dryrun=False):
         client = self._connection.client
@@ -431,7 +438,7 @@ class DocumentModel(QObject, ObservableProperties):
             return
 
         self.upscale.set_in_progress(True)
-        eventloop.run(_report_errors(self, self._enqueue_job(job, inputs)))
+        _run_reporting_errors(self, self._enqueue_job(job, inputs))
 
         self._doc.resize(job.params.bounds.extent)
         self.upscale.target_extent_changed.emit(self.upscale.target_extent)
@@ -451,7 +458,7 @@ class DocumentModel(QObject, ObservableProperties):
 
     def generate_live(self):
         input, job_params = self._prepare_live_workflow()
-        eventloop.run(_report_errors(self, self._generate_live(input, job_params)))
+        _run_reporting_errors(self, self._generate_live(input, job_params))
 
     def _prepare_live_workflow(self):
         strength = self.live.strength
@@ -603,7 +610,8 @@ class DocumentModel(QObject, ObservableProperties):
             if self._layer:  # exclude preview layer
                 exclude.append(self._layer)
 
-        if not any(l.is_visible and l not in exclude for l in self.layers.images):
+        exclude_ids = {l.id for l in exclude}
+        if not any(l.is_visible and l.id not in exclude_ids for l in self.layers.images):
             warning = _(
                 "Tried to capture the current image, but there are no visible layers! Preview and control layers are not considered to be part of the input image."
             )
@@ -630,7 +638,7 @@ class DocumentModel(QObject, ObservableProperties):
             return
 
         self.clear_error()
-        eventloop.run(_report_errors(self, self._enqueue_job(job, input)))
+        _run_reporting_errors(self, self._enqueue_job(job, input))
         return job
 
     def cancel(self, active=False, queued=False):
@@ -641,8 +649,7 @@ class DocumentModel(QObject, ObservableProperties):
 
     def clear_queued(self):
         to_remove = [job for job in self.jobs if job.state is JobState.queued]
-        for job in to_remove:
-            self.jobs.remove(job)
+        self.jobs.remove_many(to_remove)
         return [job.id for job in to_remove if job.id is not None]
 
     def report_error(self, error: Error | str):
@@ -668,12 +675,10 @@ class DocumentModel(QObject, ObservableProperties):
             self.progress_changed.emit(-1)
         elif message.event is ClientEvent.progress:
             self.jobs.notify_started(job)
-            self.progress_kind = ProgressKind.generation
-            self.progress = message.progress
+            self._report_progress(ProgressKind.generation, message.progress)
         elif message.event is ClientEvent.upload:
             self.jobs.notify_started(job)
-            self.progress_kind = ProgressKind.upload
-            self.progress = message.progress
+            self._report_progress(ProgressKind.upload, message.progress)
         elif message.event is ClientEvent.output:
             self.custom.handle_output(job, message.result)
         elif message.event is ClientEvent.finished:
@@ -697,6 +702,13 @@ class DocumentModel(QObject, ObservableProperties):
             assert isinstance(message.error, str) and isinstance(message.result, dict)
             self.report_error(Error(ErrorKind.insufficient_funds, message.error, message.result))
 
+    def _report_progress(self, kind: ProgressKind, value: float):
+        # Skip tiny increments, progress bars can't show them and every change updates the UI
+        if kind is self.progress_kind and abs(value - self.progress) < 0.01 and value < 1:
+            return
+        self.progress_kind = kind
+        self.progress = value
+
     def _finish_job(self, job: Job, event: ClientEvent):
         if job.kind is JobKind.upscaling:
             self.upscale.set_in_progress(False)
@@ -1100,7 +1112,7 @@ class CustomInpaint(QObject, ObservableProperties):
         return None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UpscaleParams:
     upscale: UpscaleInput
     factor: float
@@ -1272,7 +1284,7 @@ class LiveWorkspace(QObject, ObservableProperties):
             self._is_active = active
             self.is_active_changed.emit(active)
             if active:
-                eventloop.run(_report_errors(self.model, self._continue_generating()))
+                _run_reporting_errors(self.model, self._continue_generating())
             else:
                 self.is_recording = False
 
@@ -1295,7 +1307,7 @@ class LiveWorkspace(QObject, ObservableProperties):
                 self.set_result(job.results[0], job.params)
             self.is_active = self._is_active and self.model.document.is_active
             self._scheduler.notify_generation_finished()
-            eventloop.run(_report_errors(self.model, self._continue_generating()))
+            _run_reporting_errors(self.model, self._continue_generating())
 
     async def _continue_generating(self):
         while self.is_active:
@@ -1422,7 +1434,7 @@ class AnimationWorkspace(QObject, ObservableProperties):
 
     def generate_frame(self):
         self._model.clear_error()
-        eventloop.run(_report_errors(self._model, self._generate_frame()))
+        _run_reporting_errors(self._model, self._generate_frame())
 
     def _prepare_input(self, canvas: Image | Extent, seed: int, time: int):
         m = self._model
@@ -1481,7 +1493,7 @@ class AnimationWorkspace(QObject, ObservableProperties):
             return
 
         m.clear_error()
-        eventloop.run(_report_errors(m, self._generate_batch()))
+        _run_reporting_errors(m, self._generate_batch())
 
     async def _generate_batch(self):
         m = self._model
@@ -1607,12 +1619,20 @@ def calc_selection_pre_process(
     return inpaint
 
 
-async def _report_errors(parent: DocumentModel, coro):
-    try:
-        return await coro
-    except NetworkError as e:
+def _run_reporting_errors(parent: DocumentModel, coro: Coroutine[Any, Any, Any]):
+    # Report from a done-callback instead of wrapping the coroutine in another one
+    task = eventloop.run(coro)
+    task.add_done_callback(lambda t: _report_task_error(parent, t))
+    return task
+
+
+def _report_task_error(parent: DocumentModel, task: asyncio.Task):
+    if task.cancelled():
+        return
+    e = task.exception()
+    if isinstance(e, NetworkError):
         parent.report_error(f"{util.log_error(e)} [url={e.url}, code={e.code}]")
-    except Exception as e:
+    elif isinstance(e, Exception):
         parent.report_error(util.log_error(e))
 
 
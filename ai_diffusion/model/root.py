@@ -163,13 +163,12 @@ class Root(QObject):
             return persist.memory_used
         return 0
 
-    def _find_model(self, job_id: str) -> DocumentModel | None:
-        return next((m.model for m in self._models if m.model.jobs.find(job_id)), None)
-
     def _handle_message(self, msg: ClientMessage):
-        model = self._find_model(msg.job_id)
-        if model is not None:
-            model.handle_message(msg)
+        # Called for every progress update, avoid creating a generator to search models
+        for m in self._models:
+            if m.model.jobs.find(msg.job_id) is not None:
+                m.model.handle_message(msg)
+                return
 
     def _update_files(self):
         if client := self._connection.client_if_connected:
@@ -92,7 +92,7 @@ def log_error(error: Exception):
         message = f"Error: Internal assertion failed [{error}]"
     elif not message.startswith("Error:"):
         message = f"Error: {message}"
-    client_logger.exception(message)
+    client_logger.exception(message, exc_info=error)
     return message
 
 
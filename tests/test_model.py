@@ -6,6 +6,7 @@ from __future__ import annotations
 import asyncio
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import pytest
@@ -15,15 +16,16 @@ from PyQt5.QtCore import QByteArray, Qt
 
 from ai_diffusion.backend.api import WorkflowInput, WorkflowKind
 from ai_diffusion.backend.client import CheckpointInfo, ClientEvent, ClientMessage
+from ai_diffusion.backend.network import NetworkError
 from ai_diffusion.backend.resources import Arch, ControlMode
 from ai_diffusion.document import KritaDocument
 from ai_diffusion.image import BlendMode, Bounds, Extent, Image, ImageCollection
 from ai_diffusion.layer import Layer, LayerType
 from ai_diffusion.model.connection import Connection, ConnectionState
 from ai_diffusion.model.custom_workflow import WorkflowCollection
-from ai_diffusion.model.jobs import Job, JobKind, JobParams, JobRegion, JobState
+from ai_diffusion.model.jobs import Job, JobKind, JobParams, JobQueue, JobRegion, JobState
 from ai_diffusion.model.model import DocumentModel, ErrorKind, ProgressKind, no_error
-from ai_diffusion.settings import ApplyBehavior, ApplyRegionBehavior
+from ai_diffusion.settings import ApplyBehavior, ApplyRegionBehavior, settings
 from ai_diffusion.style import Style
 
 from .conftest import qtapp
@@ -322,6 +324,14 @@ async def test_job_queued_progress_finished(workflows_dir: Path):
         assert model.progress == pytest.approx(0.5)
         assert model.progress_kind is ProgressKind.generation
 
+        client.push(ClientMessage(ClientEvent.progress, job.id, progress=0.505))
+        await asyncio.sleep(0)
+        assert model.progress == pytest.approx(0.5), "small increments should be skipped"
+
+        client.push(ClientMessage(ClientEvent.progress, job.id, progress=0.52))
+        await asyncio.sleep(0)
+        assert model.progress == pytest.approx(0.52)
+
         result_images = ImageCollection([Image.create(Extent(512, 512))])
         client.push(ClientMessage(ClientEvent.finished, job.id, images=result_images))
         await _wait_for_job_state(job, JobState.finished)
@@ -437,6 +447,26 @@ async def test_job_disconnect_reconnect(workflows_dir: Path):
         assert model.error == no_error
 
 
+@qtapp
+async def test_enqueue_network_error(workflows_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    """Errors raised while enqueueing in the background are reported on the model."""
+    krita_doc = Krita.instance().openDocument("test")
+    async with _model_env(krita_doc, workflows_dir) as (model, client):
+
+        async def enqueue_fail(work: WorkflowInput, front: bool = False) -> str:
+            raise NetworkError(500, "Server unavailable", "http://mock")
+
+        monkeypatch.setattr(client, "enqueue", enqueue_fail)
+        model.generate()
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if model.error:
+                break
+        assert model.error.kind is ErrorKind.server_error
+        assert "Server unavailable" in model.error.message
+        assert "url=http://mock, code=500" in model.error.message
+
+
 # ---------------------------------------------------------------------------
 # Helpers for result / preview tests
 # ---------------------------------------------------------------------------
@@ -461,10 +491,10 @@ def _make_finished_job(
     if regions:
         params.regions = regions
     job = model.jobs.add(JobKind.diffusion, params)
-    job.id = "test-job"
+    model.jobs.assign_id(job, "test-job")
     assert job.id is not None
     model.jobs.set_results(job, ImageCollection(result_images))
-    job.state = JobState.finished
+    model.jobs.notify_finished(job)
     return job
 
 
@@ -742,3 +772,147 @@ async def test_apply_region_group(workflows_dir: Path):
         assert isinstance(r2_right, tuple) and r2_right[3] == 0, (
             "result2: right side must be transparent"
         )
+
+
+# ---------------------------------------------------------------------------
+# Job queue tests
+# ---------------------------------------------------------------------------
+
+
+def test_job_queue_find():
+    jobs = JobQueue()
+    params = JobParams(_DOC_BOUNDS, "test")
+    history = jobs.add_job(Job("history", JobKind.diffusion, params))
+    pending = jobs.add(JobKind.control_layer, params)
+    assert jobs.find("history") is history
+    assert jobs.find("pending") is None
+
+    jobs.assign_id(pending, "pending")
+    assert jobs.find("pending") is pending
+
+    jobs.remove(pending)
+    assert jobs.find("pending") is None
+    assert jobs.find("history") is history
+
+
+def test_job_queue_assign_id_after_remove():
+    jobs = JobQueue()
+    job = jobs.add(JobKind.diffusion, JobParams(_DOC_BOUNDS, "test"))
+    jobs.remove(job)  # eg. cancelled before the server returned an id
+    jobs.assign_id(job, "late")
+    assert job.id == "late"
+    assert jobs.find("late") is None
+
+
+def test_job_queue_memory_usage():
+    jobs = JobQueue()
+    params = JobParams(_DOC_BOUNDS, "test")
+    job = jobs.add_job(Job("job", JobKind.diffusion, params))
+    images = [Image.create(Extent(512, 512)) for _ in range(2)]
+    jobs.set_results(job, ImageCollection(images))
+    mb_per_image = images[0].size / (1024**2)
+    assert jobs.memory_usage == pytest.approx(2 * mb_per_image)
+
+    jobs.discard("job", 0)
+    assert job.memory_usage == images[0].size
+    assert jobs.memory_usage == pytest.approx(mb_per_image)
+
+    jobs.discard("job", 0)
+    assert jobs.memory_usage == 0
+    assert jobs.find("job") is None
+
+
+def test_job_queue_count():
+    jobs = JobQueue()
+    params = JobParams(_DOC_BOUNDS, "test")
+    job1 = jobs.add_job(Job("job1", JobKind.diffusion, params))
+    job2 = jobs.add_job(Job("job2", JobKind.diffusion, params))
+    job3 = jobs.add_job(Job("job3", JobKind.control_layer, params))
+    assert jobs.count(JobState.queued) == 3
+    assert not jobs.any_executing()
+
+    jobs.notify_started(job1)
+    jobs.notify_started(job1)
+    assert jobs.count(JobState.queued) == 2
+    assert jobs.count(JobState.executing) == 1
+    assert jobs.any_executing()
+
+    jobs.notify_finished(job3)  # cancels earlier jobs which are still pending
+    assert job1.state is JobState.cancelled and job2.state is JobState.cancelled
+    assert jobs.count(JobState.cancelled) == 2
+    assert jobs.count(JobState.queued) == 0
+    assert jobs.count(JobState.finished) == 0  # control layer job was removed
+    assert not jobs.any_executing()
+
+    jobs.remove(job1)
+    assert jobs.count(JobState.cancelled) == 1
+
+
+def test_job_timestamp():
+    before = datetime.now(timezone.utc)
+    job = Job("job", JobKind.diffusion, JobParams(_DOC_BOUNDS, "test"))
+    assert before - timedelta(seconds=1) <= job.timestamp <= datetime.now(timezone.utc)
+    assert job.timestamp.tzinfo is timezone.utc
+
+
+def test_job_queue_prune_history_only(monkeypatch):
+    monkeypatch.setattr(settings, "history_size", 1)
+    jobs = JobQueue()
+    params = JobParams(_DOC_BOUNDS, "test")
+    images = ImageCollection([Image.create(Extent(512, 512))])  # 1 MB
+    pending = jobs.add(JobKind.control_layer, params)
+    old = jobs.add_job(Job("old", JobKind.diffusion, params))
+    live = jobs.add(JobKind.live_preview, params)
+    new = jobs.add_job(Job("new", JobKind.diffusion, params))
+    assert list(jobs) == [pending, old, live, new]
+    assert len(jobs) == 4 and jobs[2] is live
+
+    jobs.set_results(old, images)
+    jobs.set_results(new, images)
+    assert list(jobs) == [pending, live, new]
+    assert jobs.find("old") is None
+    assert jobs.memory_usage == pytest.approx(1)
+
+
+def test_job_queue_remove_many():
+    jobs = JobQueue()
+    params = JobParams(_DOC_BOUNDS, "test")
+    job1 = jobs.add_job(Job("job1", JobKind.diffusion, params))
+    job2 = jobs.add_job(Job("job2", JobKind.upscaling, params))
+    job3 = jobs.add_job(Job("job3", JobKind.diffusion, params))
+    signals = []
+    jobs.count_changed.connect(lambda: signals.append(True))
+
+    jobs.remove_many([job1, job2])
+    assert list(jobs) == [job3]
+    assert jobs.find("job1") is None and jobs.find("job2") is None
+    assert jobs.count(JobState.queued) == 1
+    assert len(signals) == 1
+
+    jobs.remove_many([])
+    assert len(signals) == 1
+
+
+def test_job_queue_notify_started_once():
+    jobs = JobQueue()
+    job = jobs.add_job(Job("job", JobKind.diffusion, JobParams(_DOC_BOUNDS, "test")))
+    signals = []
+    jobs.count_changed.connect(lambda: signals.append(True))
+
+    for _ in range(3):  # called for every progress message
+        jobs.notify_started(job)
+    assert job.state is JobState.executing
+    assert jobs.count(JobState.executing) == 1
+    assert len(signals) == 1
+
+
+def test_job_results_default_empty():
+    jobs = JobQueue()
+    params = JobParams(_DOC_BOUNDS, "test")
+    job1 = jobs.add_job(Job("job1", JobKind.diffusion, params))
+    job2 = jobs.add_job(Job("job2", JobKind.diffusion, params))
+    assert len(job1.results) == 0 and len(job2.results) == 0
+
+    jobs.set_results(job1, ImageCollection([Image.create(Extent(4, 4))]))
+    assert len(job1.results) == 1
+    assert len(job2.results) == 0
@@ -80,6 +80,17 @@ def test_property():
     assert called == [42, "hello", Piong.b, 5, 55]
 
 
+def test_property_unchanged():
+    called = []
+    t = ObjectWithProperties()
+    t.inty_changed.connect(called.append)
+    t.inty = 42
+    t.inty = 42
+    t.enumy_changed.connect(called.append)
+    t.enumy = Piong.a
+    assert called == [42]
+
+
 def test_multiple():
     a = ObjectWithProperties()
     b = ObjectWithProperties()